@@ -4,7 +4,7 @@ import sys
 # Add modules to the path
 sys.path.append("./packages/calendar-api/weekly")
 
-from requests import get as fetch
+from requests import Session
 
 from lib.events import Event
 
@@ -15,17 +15,22 @@ if url is None:
 
 assert url
 
+_session = Session()
+_session.headers["Accept"] = "text/calendar"
+
 
 def weekly_calendar(text):
-    Event.parse_ics(text)
-    return {"events": [e.__dict__ for e in Event.current_week()]}
+    calendar = Event.parse_ics(text)
+    return {"events": [e.to_dict() for e in Event.current_week(calendar)]}
 
 
 if __name__ == "__main__":
     text: str = ""
 
     if url:
-        text = fetch(url).text
+        response = _session.get(url, timeout=(3, 10))
+        response.raise_for_status()
+        text = response.text
     else:
         try:
             with open("calendar.ics") as f:
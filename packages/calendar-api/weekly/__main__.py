@@ -3,12 +3,39 @@ from os import environ
 from lib.events import Event
 from lib.calendar import Week
 
-from requests import get as fetch
+from requests import Session
 
 
 user_token = environ.get("USER_TOKEN", "")
 url = environ.get("ICS_URL", "")
 
+# Shared across invocations of a warm function instance to reuse connections.
+_session = Session()
+_session.headers["Accept"] = "text/calendar"
+
+# Last fetched calendar, kept across invocations of a warm function instance.
+_cache = {"etag": None, "modified": None, "calendar": None}
+
+
+def _fetch_calendar():
+    # Unset validators are dropped from the request headers.
+    response = _session.get(
+        url,
+        headers={
+            "If-None-Match": _cache["etag"],
+            "If-Modified-Since": _cache["modified"],
+        },
+        timeout=(3, 10),
+    )
+    response.raise_for_status()
+    if response.status_code == 304 and _cache["calendar"] is not None:
+        return _cache["calendar"]
+
+    _cache["calendar"] = Event.parse_ics(response.text)
+    _cache["etag"] = response.headers.get("ETag")
+    _cache["modified"] = response.headers.get("Last-Modified")
+    return _cache["calendar"]
+
 
 def main(event):
     token: str | None = None
@@ -27,14 +54,13 @@ def main(event):
         }
 
     try:
-        text = fetch(url).text
-        Event.parse_ics(text)
+        calendar = _fetch_calendar()
 
         return {
             "body": {
-                "calendar": Week().__dict__,
-                "events": [e.__dict__ for e in Event.current_week()],
-                "timezone": f"{Event.timezone}",
+                "calendar": Week().to_dict(),
+                "events": [e.to_dict() for e in Event.current_week(calendar)],
+                "timezone": f"{calendar.timezone}",
             }
         }
     except Exception as e:
@@ -2,13 +2,34 @@ from zoneinfo import ZoneInfo
 from datetime import datetime, timedelta
 
 
+_TOKYO = ZoneInfo("Asia/Tokyo")
+# Labels indexed by `weekday()` and `month - 1`, avoiding locale-aware strftime.
+DAY_LABELS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTH_LABELS = (
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+
+
 class Day:
+    __slots__ = ("date",)
+
     def __init__(self, date: datetime):
         self.date = date
 
     @property
     def name(self):
-        return self.date.strftime("%a")[0]
+        return DAY_LABELS[self.date.weekday()][0]
 
     @property
     def day(self):
@@ -16,7 +37,7 @@ class Day:
 
     @property
     def month(self):
-        return self.date.strftime("%b")
+        return MONTH_LABELS[self.date.month - 1]
 
     @property
     def year(self):
@@ -28,8 +49,7 @@ class Day:
     def __repr__(self):
         return f"<class {type(self).__name__}: {self}>"
 
-    @property
-    def __dict__(self):
+    def to_dict(self) -> dict:
         return {
             "day": self.day,
             "month": self.month,
@@ -39,12 +59,17 @@ class Day:
 
 
 class Week:
-    def __init__(self, date=datetime.now(tz=ZoneInfo("Asia/Tokyo"))):
-        self.date = date
+    __slots__ = ("date",)
+
+    def __init__(self, date: datetime | None = None):
+        self.date = date or datetime.now(_TOKYO)
 
     @property
     def week_number(self):
-        return self.date.strftime("%W")
+        # Same numbering as strftime("%W"): weeks start on Monday, and days
+        # before the first Monday of the year are in week 00.
+        day_of_year = self.date.timetuple().tm_yday - 1
+        return f"{(day_of_year + 7 - self.date.weekday()) // 7:02d}"
 
     @property
     def year(self):
@@ -59,14 +84,13 @@ class Week:
 
         return [Day(monday + timedelta(days=i)) for i in range(7)]
 
-    @property
-    def __dict__(self) -> dict:
+    def to_dict(self) -> dict:
         return {
             "year": self.year,
             "week_number": self.week_number,
-            "weekdays": [d.__dict__ for d in self.days_of_week],
+            "weekdays": [d.to_dict() for d in self.days_of_week],
         }
 
 
 if __name__ == "__main__":
-    print(Week().__dict__)
+    print(Week().to_dict())
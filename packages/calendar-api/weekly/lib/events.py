@@ -1,14 +1,40 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta, tzinfo
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone as FixedOffset, tzinfo
 from enum import Enum, StrEnum
-from typing import List, Self, Tuple
+from functools import lru_cache
+from heapq import merge
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Self, Tuple
 from zoneinfo import ZoneInfo
 
+from lib.calendar import DAY_LABELS, MONTH_LABELS
+
 
 UTC = ZoneInfo("UTC")
 
+# Matches the content lines the parser cares about, splitting the token name,
+# its optional parameters (e.g. `;TZID=Asia/Tokyo`) and its value.
+_ICS_LINE = re.compile(
+    r"^(BEGIN|END|SUMMARY|DTSTART|DTEND|RRULE|TZID)((?:;[^:\r\n]*)?):([^\r\n]*)",
+    re.MULTILINE,
+)
+# Zones without daylight saving time, that need no tz database lookup.
+_FIXED_OFFSET_ZONE = re.compile(r"Etc/GMT([+-]\d{1,2})")
+
+
+@lru_cache(maxsize=128)
+def _zi(name: str) -> tzinfo:
+    match = _FIXED_OFFSET_ZONE.fullmatch(name)
+    if match is None:
+        return ZoneInfo(name)
+    # POSIX style signs are inverted: Etc/GMT-9 is 9 hours ahead of UTC.
+    return FixedOffset(timedelta(hours=-int(match.group(1))), name)
+
 
 class DateUtils:
     @classmethod
@@ -16,6 +42,22 @@ class DateUtils:
         cls, raw_string: str, timezone: tzinfo, is_date: bool = False
     ) -> datetime:
         date: datetime
+        # UTC date-times (YYYYMMDDTHHMMSSZ) are the most common shape in the
+        # wild: build them from their digits rather than through fromisoformat.
+        if len(raw_string) == 16 and raw_string[8] == "T" and raw_string[-1] == "Z":
+            date = datetime(
+                int(raw_string[0:4]),
+                int(raw_string[4:6]),
+                int(raw_string[6:8]),
+                int(raw_string[9:11]),
+                int(raw_string[11:13]),
+                int(raw_string[13:15]),
+                tzinfo=UTC,
+            )
+            if timezone is UTC:
+                return date
+            return date.astimezone(timezone)
+
         if is_date:
             date = datetime.strptime(raw_string, "%Y%m%d")
         else:
@@ -34,54 +76,26 @@ class DateUtils:
         return start, end
 
 
-class ParserNotCalledError(Exception):
-    def __str__(self) -> str:
-        return "Parse an ICS file before calling this method"
-
-
-class InvalidTokenError(Exception):
-    def __str__(self) -> str:
-        return "Invalid token"
-
-
 class InvalidEventError(Exception):
     def __str__(self) -> str:
         return "Invalid event."
 
 
-class Token(StrEnum):
-    @classmethod
-    def include(cls, token: str) -> bool:
-        try:
-            cls(token)
-            return True
-        except Exception:
-            return False
-
-
-class CalendarToken(Token):
+class CalendarToken(StrEnum):
     Timezone = "TZID"
     Begin = "BEGIN"
     End = "END"
     Event = "VEVENT"
 
 
-class EventToken(Token):
+class EventToken(StrEnum):
     Summary = "SUMMARY"
     DateStart = "DTSTART"
     DateEnd = "DTEND"
     RepeatingEventRule = "RRULE"
 
-    @classmethod
-    def include(cls, token: str) -> bool:
-        return (
-            super().include(token)
-            or token.startswith(EventToken.DateStart)
-            or token.startswith(EventToken.DateEnd)
-        )
-
 
-class RuleToken(Token):
+class RuleToken(StrEnum):
     Frequency = "FREQ"
     Until = "UNTIL"
     Interval = "INTERVAL"
@@ -104,50 +118,52 @@ class Day(Enum):
     Sunday = "SU"
 
 
-@dataclass
+# Rule parts handlers, keyed by ICS token: the rule field they fill and the
+# parser of their value.
+_RULE_PARTS: Dict[str, Tuple[str, Callable[[str, tzinfo], Any]]] = {
+    RuleToken.Frequency: (
+        "frequency",
+        lambda content, _: Frequency.__members__.get(content),
+    ),
+    RuleToken.Until: ("until", DateUtils.parse_date),
+    RuleToken.Interval: ("interval", lambda content, _: int(content)),
+    RuleToken.ByDay: ("by_day", lambda content, _: Day(content)),
+}
+
+
+@dataclass(slots=True)
 class Rule:
     frequency: Frequency
     until: datetime | None = None
     interval: int | None = None
     by_day: Day | None = None
 
-    @property
-    def finished(self) -> bool:
-        return self.until is not None and datetime.now(UTC) > self.until
+    def finished(self, at: datetime) -> bool:
+        return self.until is not None and at > self.until
 
     def __str__(self) -> str:
         by_day = self.by_day and f" on the {self.by_day.name.lower()}" or ""
         interval = self.interval and f"every {self.interval} " or ""
-        finished = self.finished and " (finished)" or ""
+        finished = self.finished(datetime.now(UTC)) and " (finished)" or ""
         return f"Repeating {interval}{self.frequency.name.lower()}{by_day}{finished}."
 
     @classmethod
     def parse_ics_rule(cls, rule: str, timezone: tzinfo) -> Self | None:
-        frequency: Frequency
-        until: datetime | None = None
-        interval: int | None = None
-        by_day: Day | None = None
-
-        instructions = rule.split(";")
-
-        for instruction in instructions:
-            token, content = instruction.strip().split("=")
-            if token == RuleToken.Frequency:
-                try:
-                    frequency = Frequency[content]
-                except Exception:
-                    return None
-            if token == RuleToken.Until:
-                until = DateUtils.parse_date(content, timezone)
-            if token == RuleToken.Interval:
-                interval = int(content)
-            if token == RuleToken.ByDay:
-                by_day = Day(content)
-
-        return cls(frequency=frequency, until=until, interval=interval, by_day=by_day)
-
-
-@dataclass
+        parts: Dict[str, Any] = {}
+
+        for instruction in rule.split(";"):
+            token, _, content = instruction.partition("=")
+            if token in _RULE_PARTS:
+                name, parse = _RULE_PARTS[token]
+                parts[name] = parse(content, timezone)
+
+        # Unsupported frequencies are ignored
+        if parts.get("frequency") is None:
+            return None
+        return cls(**parts)
+
+
+@dataclass(slots=True)
 class Event:
     all_day: bool = False
     rule: Rule | None = None
@@ -165,13 +181,20 @@ class Event:
     def repeating(self) -> bool:
         return self.rule is not None
 
+    def occurrence(self, begin: datetime) -> Event:
+        """
+        Return a copy of the event rescheduled to begin at the given date.
+        """
+        duration = (self.end or self.date) - self.date
+        return replace(self, begin=begin, end=begin + duration)
+
     @property
     def day(self) -> int:
         return self.date.day
 
     @property
     def day_label(self) -> str:
-        return self.date.strftime("%a")
+        return DAY_LABELS[self.date.weekday()]
 
     @property
     def month(self) -> int:
@@ -179,7 +202,7 @@ class Event:
 
     @property
     def month_label(self) -> str:
-        return self.date.strftime("%b")
+        return MONTH_LABELS[self.date.month - 1]
 
     @property
     def year(self) -> int:
@@ -187,7 +210,8 @@ class Event:
 
     @property
     def time(self) -> str:
-        return self.date.strftime("%H:%M")
+        date = self.date
+        return f"{date.hour:02d}:{date.minute:02d}"
 
     def __repr__(self):
         is_repeating = self.repeating and f". {self.rule}" or ""
@@ -197,19 +221,19 @@ class Event:
     def __str__(self) -> str:
         return "{} {} {} {}".format(self.month_label, self.day, self.time, self.name)
 
-    @property
-    def __dict__(self):
+    def to_dict(self) -> dict:
+        date = self.date
         return {
             "all_day": self.all_day,
             "repeating": self.repeating,
             "name": self.name,
-            "date": self.date.isoformat(),
-            "day": self.day,
-            "dayLabel": self.day_label,
-            "year": self.year,
-            "month": self.month,
-            "monthLabel": self.month_label,
-            "time": self.time,
+            "date": date.isoformat(),
+            "day": date.day,
+            "dayLabel": DAY_LABELS[date.weekday()],
+            "year": date.year,
+            "month": date.month,
+            "monthLabel": MONTH_LABELS[date.month - 1],
+            "time": f"{date.hour:02d}:{date.minute:02d}",
         }
 
     @classmethod
@@ -219,114 +243,190 @@ class Event:
         timezone: tzinfo | None = None
 
         for part in parts:
-            try:
-                token, content = part.split("=")
-
-                if token == "TZID":
-                    timezone = ZoneInfo(content)
-                if token == "VALUE":
-                    all_day = True
-            except Exception:
+            token, sep, content = part.partition("=")
+            if not sep:
                 continue
 
+            if token == "TZID":
+                timezone = _zi(content)
+            if token == "VALUE":
+                all_day = True
+
         return all_day, timezone
 
     @classmethod
-    def parse_ics(cls, text: str):
+    @lru_cache(maxsize=4)
+    def parse_ics(cls, text: str) -> ParsedCalendar:
         events = []
         timezone: tzinfo = UTC
-        event: Event | None = None
-
-        for line in text.split("\n"):
-            # Parse tag content
-            try:
-                (token, content) = line.strip().split(":", maxsplit=1)
-                # Token validation
-                if not (
-                    CalendarToken.include(token)
-                    or RuleToken.include(token)
-                    or EventToken.include(token)
-                ):
-                    raise InvalidTokenError()
-            except Exception:
-                continue
+        event = Event()
+        in_event = False
+        # Depth of the components nested in the current event, like VALARM
+        nested = 0
+
+        # Unfold long lines, which are split by a line break followed by a space
+        # or a tab. Most feeds have none, so the text is only rewritten if needed.
+        if "\n " in text or "\n\t" in text:
+            text = (
+                text.replace("\r\n ", "")
+                .replace("\r\n\t", "")
+                .replace("\n ", "")
+                .replace("\n\t", "")
+            )
+
+        for match in _ICS_LINE.finditer(text):
+            token, params, content = match.groups()
+
+            # Outside of events, only the calendar timezone and the start of the
+            # next event matter: VTIMEZONE content and the like is skipped.
+            if not in_event:
+                if token == CalendarToken.Begin and content == CalendarToken.Event:
+                    event = Event()
+                    in_event = True
+                elif token == CalendarToken.Timezone:
+                    timezone = _zi(content)
+            elif token == CalendarToken.Begin:
+                nested += 1
+            elif token == CalendarToken.End:
+                if nested:
+                    nested -= 1
+                elif content == CalendarToken.Event:
+                    events.append(event)
+                    in_event = False
+            # Properties of nested components do not belong to the event
+            elif not nested and token in _EVENT_PROPERTIES:
+                _EVENT_PROPERTIES[token](event, params, content, timezone)
+
+        return ParsedCalendar.from_events(events, timezone)
+
+    @classmethod
+    def included(
+        cls, calendar: ParsedCalendar, begin: datetime, end: datetime
+    ) -> List[Event]:
+        begin_ts, end_ts = begin.timestamp(), end.timestamp()
+        lo = bisect_right(calendar.begin, begin_ts)
+        hi = bisect_left(calendar.begin, end_ts, lo)
+        # Already sorted, as calendar events are ordered by begin date
+        events = [
+            calendar.events[i] for i in range(lo, hi) if calendar.end[i] < end_ts
+        ]
+        occurrences = []
+
+        week = timedelta(weeks=1)
+        for e in calendar.weekly:
+            # Step by whole weeks in the event's own timezone, which keeps its wall
+            # clock time across DST changes, starting a week early to absorb them.
+            k = max((begin - e.date) // week - 1, 1)
+            date = (e.date + k * week).astimezone(calendar.timezone)
+            while date < end:
+                if date >= begin and not e.rule.finished(date):
+                    occurrences.append(e.occurrence(date))
+                k += 1
+                date = (e.date + k * week).astimezone(calendar.timezone)
+
+        day = begin
+        while day < end:
+            for e in calendar.yearly_by_md.get((day.month, day.day), ()):
+                local = e.date.astimezone(calendar.timezone)
+                date = local.replace(year=day.year)
+                if date > e.date and not e.rule.finished(date):
+                    occurrences.append(e.occurrence(date))
+            day += timedelta(days=1)
+        # TODO: Implement DAILY, ByDay and Interval
+        occurrences.sort(key=attrgetter("begin"))
+        return list(merge(events, occurrences, key=attrgetter("begin")))
 
-            if token == CalendarToken.Timezone:
-                timezone = ZoneInfo(content)
+    @classmethod
+    def current_week(
+        cls, calendar: ParsedCalendar, now: datetime | None = None
+    ) -> List[Event]:
+        """
+        Return the events of the week of `now` (defaults to the current time), in
+        the calendar timezone.
+        """
+        now_utc = now or datetime.now(UTC)
+        now_local = now_utc.astimezone(calendar.timezone)
+        start, end = DateUtils.week(now_local)
+        return cls.included(calendar, start, end)
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedCalendar:
+    """
+    Result of parsing an ICS text. Instances are cached and shared between
+    requests: their events must not be mutated, use `Event.occurrence` or
+    `dataclasses.replace` to derive new ones.
+    """
+
+    events: Tuple[Event, ...]
+    timezone: tzinfo
+    # Event bounds as POSIX timestamps, in the same order as `events`, so that
+    # selecting a time window is a bisection over plain floats.
+    begin: Tuple[float, ...]
+    end: Tuple[float, ...]
+    # Weekly series, expanded per window in their own timezone, and yearly ones
+    # indexed by the day they recur on, so that a window lookup only visits the
+    # series occurring on its days.
+    weekly: Tuple[Event, ...]
+    yearly_by_md: Mapping[Tuple[int, int], Tuple[Event, ...]]
 
-            # Manage event parsing lifecycle
-            is_event = content == CalendarToken.Event
-            if token == CalendarToken.Begin and is_event:
-                event = Event()
-                continue
-            elif token == CalendarToken.End and is_event and event is not None:
-                events.append(event)
-                event = None
-            if event is None:
+    @classmethod
+    def from_events(cls, events: List[Event], timezone: tzinfo) -> Self:
+        events = sorted(events, key=lambda e: e.date)
+        weekly: List[Event] = []
+        yearly_by_md: Dict[Tuple[int, int], List[Event]] = {}
+
+        for e in events:
+            if e.rule is None:
                 continue
+            if e.rule.frequency == Frequency.WEEKLY:
+                weekly.append(e)
+            elif e.rule.frequency == Frequency.YEARLY:
+                # Recurrence days are those of the calendar timezone, in which
+                # windows are computed, rather than those of the event's own TZID.
+                local = e.date.astimezone(timezone)
+                yearly_by_md.setdefault((local.month, local.day), []).append(e)
+
+        return cls(
+            events=tuple(events),
+            timezone=timezone,
+            begin=tuple(e.date.timestamp() for e in events),
+            end=tuple((e.end or e.date).timestamp() for e in events),
+            weekly=tuple(weekly),
+            yearly_by_md=MappingProxyType(
+                {k: tuple(v) for k, v in yearly_by_md.items()}
+            ),
+        )
 
-            if token == EventToken.Summary:
-                event.name = content.replace("\\", "")
-            elif token.startswith(EventToken.DateStart):
-                all_day, event_timezone = cls._parse_date_token(token)
-                event.all_day = all_day
-                event.begin = DateUtils.parse_date(
-                    content, event_timezone or timezone, is_date=all_day
-                )
-            elif token.startswith(EventToken.DateEnd):
-                all_day, event_timezone = cls._parse_date_token(token)
-                event.all_day = all_day
-                event.end = DateUtils.parse_date(
-                    content, event_timezone or timezone, is_date=all_day
-                )
-            elif token == "RRULE":
-                event.rule = Rule.parse_ics_rule(content, timezone)
-
-        cls.events = events
-        cls.timezone = timezone
-
-        return events
 
-    @classmethod
-    def included(cls, begin: datetime, end: datetime) -> List[Event]:
-        events = [e for e in cls.events if e.begin > begin and e.end < end]
-        repeating = [
-            e
-            for e in cls.events
-            if e.repeating and (e.rule.until is None or e.rule.until > end)
-        ]
+def _parse_summary(event: Event, params: str, content: str, timezone: tzinfo):
+    event.name = content.replace("\\", "")
 
-        for e in repeating:
-            if e.rule.frequency == Frequency.YEARLY:
-                date = e.begin.replace(year=begin.year)
-
-                if date > e.begin and date < e.end:
-                    events.append(e)
-            elif e.rule.frequency == Frequency.WEEKLY:
-                # get the day of the week
-                day = e.begin.weekday()
-
-                # compute on which day the event would occur in the interval
-                computed_date = begin + timedelta(days=day)
-                # replace hour and minute components with the original value
-                computed_date = computed_date.replace(
-                    hour=e.begin.hour, minute=e.begin.minute
-                )
-                # get the duration of the event
-                duration = e.begin - e.end
-
-                # Update the event begin and end properties
-                e.begin = computed_date
-                e.end = computed_date + duration
-                events.append(e)
-        # TODO: Implement DAILY, ByDay and Interval
-        events.sort(key=lambda e: e.begin)
-        return events
 
-    @classmethod
-    def current_week(cls) -> List[Event]:
-        if not cls.events:
-            raise ParserNotCalledError
+def _parse_date_start(event: Event, params: str, content: str, timezone: tzinfo):
+    all_day, event_timezone = Event._parse_date_token(params)
+    event.all_day = all_day
+    event.begin = DateUtils.parse_date(
+        content, event_timezone or timezone, is_date=all_day
+    )
+
+
+def _parse_date_end(event: Event, params: str, content: str, timezone: tzinfo):
+    all_day, event_timezone = Event._parse_date_token(params)
+    event.all_day = all_day
+    event.end = DateUtils.parse_date(
+        content, event_timezone or timezone, is_date=all_day
+    )
+
+
+def _parse_rule(event: Event, params: str, content: str, timezone: tzinfo):
+    event.rule = Rule.parse_ics_rule(content, timezone)
+
 
-        start, end = DateUtils.week(datetime.now(cls.timezone))
-        return list(cls.included(start, end))
+# Event properties handlers, keyed by ICS token.
+_EVENT_PROPERTIES: Dict[str, Callable[[Event, str, str, tzinfo], None]] = {
+    EventToken.Summary: _parse_summary,
+    EventToken.DateStart: _parse_date_start,
+    EventToken.DateEnd: _parse_date_end,
+    EventToken.RepeatingEventRule: _parse_rule,
+}
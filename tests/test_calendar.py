@@ -0,0 +1,24 @@
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add modules to the path
+sys.path.append("./packages/calendar-api/weekly")
+
+from lib.calendar import Day, Week
+
+
+class WeekTest(unittest.TestCase):
+    def test_labels_and_week_number_match_strftime(self):
+        date = datetime(2000, 1, 1)
+
+        while date.year <= 2040:
+            day, week = Day(date), Week(date)
+            self.assertEqual(week.week_number, date.strftime("%W"), date)
+            self.assertEqual(day.name, date.strftime("%a")[0], date)
+            self.assertEqual(day.month, date.strftime("%b"), date)
+            date += timedelta(days=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import sys
+import unittest
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Add modules to the path
+sys.path.append("./packages/calendar-api/weekly")
+
+from lib.events import UTC, DateUtils, Event, _zi
+
+
+def calendar(*lines: str) -> str:
+    return "\r\n".join(
+        [
+            "BEGIN:VCALENDAR",
+            "BEGIN:VTIMEZONE",
+            "TZID:Asia/Tokyo",
+            "END:VTIMEZONE",
+            *lines,
+            "END:VCALENDAR",
+        ]
+    )
+
+
+class DateUtilsTest(unittest.TestCase):
+    def test_parse_utc_date_time_matches_fromisoformat(self):
+        raw = "20261016T030000Z"
+
+        for timezone in (UTC, ZoneInfo("America/New_York")):
+            date = DateUtils.parse_date(raw, timezone)
+            expected = datetime.fromisoformat(raw).astimezone(timezone)
+
+            self.assertEqual(date, expected)
+            self.assertEqual(date.utcoffset(), expected.utcoffset())
+            self.assertIs(date.tzinfo, timezone)
+
+
+class ZoneTest(unittest.TestCase):
+    def test_fixed_offset_zones_have_inverted_signs(self):
+        self.assertEqual(_zi("Etc/GMT-9").utcoffset(None), timedelta(hours=9))
+        self.assertEqual(_zi("Etc/GMT+5").utcoffset(None), timedelta(hours=-5))
+
+    def test_fixed_offset_zones_keep_their_name(self):
+        self.assertEqual(str(_zi("Etc/GMT-9")), "Etc/GMT-9")
+        self.assertEqual(str(_zi("Asia/Tokyo")), "Asia/Tokyo")
+
+
+class ParseIcsTest(unittest.TestCase):
+    def test_nested_component_properties_are_ignored(self):
+        parsed = Event.parse_ics(
+            calendar(
+                "BEGIN:VEVENT",
+                "DTSTART:20261016T030000Z",
+                "DTEND:20261016T040000Z",
+                "SUMMARY:Single event",
+                "BEGIN:VALARM",
+                "ACTION:EMAIL",
+                "SUMMARY:Alarm notification",
+                "TRIGGER:-PT10M",
+                "END:VALARM",
+                "END:VEVENT",
+            )
+        )
+
+        self.assertEqual([e.name for e in parsed.events], ["Single event"])
+
+
+class CurrentWeekTest(unittest.TestCase):
+    # Wednesday, the week runs from Monday 12 to Sunday 18 in Tokyo
+    now = datetime(2026, 10, 14, 3, tzinfo=UTC)
+
+    def test_weekly_event_time_follows_calendar_timezone(self):
+        parsed = Event.parse_ics(
+            calendar(
+                "BEGIN:VEVENT",
+                "DTSTART;TZID=America/New_York:20260602T090000",
+                "DTEND;TZID=America/New_York:20260602T100000",
+                "RRULE:FREQ=WEEKLY",
+                "SUMMARY:New York meeting",
+                "END:VEVENT",
+            )
+        )
+
+        events = Event.current_week(parsed, self.now)
+
+        self.assertEqual(
+            [e.date.isoformat() for e in events], ["2026-10-13T22:00:00+09:00"]
+        )
+
+    def test_weekly_event_keeps_its_wall_clock_time_across_dst(self):
+        parsed = Event.parse_ics(
+            calendar(
+                "BEGIN:VEVENT",
+                "DTSTART;TZID=America/New_York:20260602T090000",
+                "DTEND;TZID=America/New_York:20260602T100000",
+                "RRULE:FREQ=WEEKLY",
+                "SUMMARY:New York meeting",
+                "END:VEVENT",
+                "BEGIN:VEVENT",
+                "DTSTART;TZID=America/New_York:20260601T103000",
+                "DTEND;TZID=America/New_York:20260601T113000",
+                "RRULE:FREQ=WEEKLY",
+                "SUMMARY:New York late meeting",
+                "END:VEVENT",
+            )
+        )
+
+        # New York is on EST by December, an hour further from Tokyo than in June
+        events = Event.current_week(parsed, datetime(2026, 12, 9, tzinfo=UTC))
+
+        self.assertEqual(
+            [(e.name, e.date.isoformat()) for e in events],
+            [
+                ("New York late meeting", "2026-12-08T00:30:00+09:00"),
+                ("New York meeting", "2026-12-08T23:00:00+09:00"),
+            ],
+        )
+
+    def test_weekly_event_occurs_until_its_last_day(self):
+        parsed = Event.parse_ics(
+            calendar(
+                "BEGIN:VEVENT",
+                "DTSTART;TZID=Asia/Tokyo:20260907T100000",
+                "DTEND;TZID=Asia/Tokyo:20260907T110000",
+                "RRULE:FREQ=WEEKLY;UNTIL=20261014T000000Z",
+                "SUMMARY:Last session",
+                "END:VEVENT",
+            )
+        )
+
+        events = Event.current_week(parsed, self.now)
+
+        self.assertEqual(
+            [e.date.isoformat() for e in events], ["2026-10-12T10:00:00+09:00"]
+        )
+
+    def test_cached_calendar_is_left_untouched(self):
+        text = calendar(
+            "BEGIN:VEVENT",
+            "DTSTART;TZID=Asia/Tokyo:20260907T100000",
+            "DTEND;TZID=Asia/Tokyo:20260907T110000",
+            "RRULE:FREQ=WEEKLY",
+            "SUMMARY:Weekly session",
+            "END:VEVENT",
+        )
+        parsed = Event.parse_ics(text)
+
+        first = Event.current_week(parsed, self.now)
+        second = Event.current_week(Event.parse_ics(text), self.now)
+
+        self.assertIs(Event.parse_ics(text), parsed)
+        self.assertEqual(first, second)
+        self.assertEqual(
+            parsed.events[0].date.isoformat(), "2026-09-07T10:00:00+09:00"
+        )
+        with self.assertRaises(TypeError):
+            parsed.yearly_by_md[(1, 1)] = ()
+
+
+if __name__ == "__main__":
+    unittest.main()
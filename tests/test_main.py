@@ -0,0 +1,75 @@
+import importlib.util
+import sys
+import unittest
+
+# Add modules to the path
+sys.path.append("./packages/calendar-api/weekly")
+
+spec = importlib.util.spec_from_file_location(
+    "weekly", "./packages/calendar-api/weekly/__main__.py"
+)
+weekly = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(weekly)
+
+ICS = "\r\n".join(
+    [
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT",
+        "DTSTART:20261016T030000Z",
+        "DTEND:20261016T040000Z",
+        "SUMMARY:Single event",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+)
+
+
+class Response:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class Session:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+class FetchCalendarTest(unittest.TestCase):
+    def setUp(self):
+        self.session = Session(
+            Response(200, ICS, {"ETag": "a", "Last-Modified": "Thu, 15 Oct 2026"}),
+            Response(304),
+        )
+        self.patch("_session", self.session)
+        self.patch("_cache", {"etag": None, "modified": None, "calendar": None})
+
+    def patch(self, name, value):
+        previous = getattr(weekly, name)
+        setattr(weekly, name, value)
+        self.addCleanup(setattr, weekly, name, previous)
+
+    def test_not_modified_reuses_cached_calendar(self):
+        first = weekly._fetch_calendar()
+        second = weekly._fetch_calendar()
+
+        self.assertIs(second, first)
+        self.assertEqual([e.name for e in second.events], ["Single event"])
+        self.assertEqual(self.session.requests[0]["If-None-Match"], None)
+        self.assertEqual(self.session.requests[1]["If-None-Match"], "a")
+        self.assertEqual(
+            self.session.requests[1]["If-Modified-Since"], "Thu, 15 Oct 2026"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()